@@ -7,6 +7,7 @@ import multiprocessing
 from pathlib import Path
 from types import SimpleNamespace
 from pipeline import run_full_pipeline # Importación de función pipeline directo
+from scanner import FOREGROUND_MODES
 
 class App(ctk.CTk):
     def __init__(self):
@@ -38,6 +39,11 @@ class App(ctk.CTk):
         self.output_button = ctk.CTkButton(self.file_frame, text="Guardar en...", width=100, command=self.select_output)
         self.output_button.grid(row=1, column=2, padx=10, pady=10)
 
+        self.foreground_label = ctk.CTkLabel(self.file_frame, text="Extracción de Fondo:")
+        self.foreground_label.grid(row=2, column=0, padx=10, pady=10, sticky="w")
+        self.foreground_menu = ctk.CTkOptionMenu(self.file_frame, values=FOREGROUND_MODES)
+        self.foreground_menu.grid(row=2, column=1, padx=10, pady=10, sticky="ew")
+
         # --- Pestañas para los Modos de Salida ---
         self.tab_view = ctk.CTkTabview(self)
         self.tab_view.grid(row=1, column=0, padx=20, pady=10, sticky="ew")
@@ -164,6 +170,7 @@ class App(ctk.CTk):
         try:
             args = SimpleNamespace() # Construir un objeto 'args' para pasar a la función del pipeline
             args.input_folder = self.input_folder_entry.get()
+            args.foreground = self.foreground_menu.get()
             output_path_str = self.output_entry.get()
 
             if not args.input_folder or not output_path_str:
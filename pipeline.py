@@ -5,7 +5,7 @@ import multiprocessing
 from pathlib import Path
 
 # Importa las funciones principales de nuestros otros scripts
-from scanner import analyze_image
+from scanner import analyze_image, FOREGROUND_MODES
 from synthesizer import synthesize as synthesize_wav # Mayor claridad
 from midi_synthesizer import synthesize_midi
 from composer import compose_audio
@@ -47,10 +47,22 @@ def run_full_pipeline(args, status_callback=print):
         return
 
     status_callback(f"--- PASO 1 de 3: Analizando {len(image_files)} imagenes ---")
+    foreground = getattr(args, 'foreground', 'backdrop')
+    total_dropped = 0
     for image_file in image_files:
-        analyze_image(image_file, json_dir / image_file.with_suffix(".json").name)
+        stats = analyze_image(image_file, json_dir / image_file.with_suffix(".json").name, foreground)
+        if stats:
+            total_dropped += stats[1]
+            if stats[0] == 0:
+                status_callback(f"{image_file.name}: sin eventos tras quitar el fondo, omitida")
+            else:
+                status_callback(f"{image_file.name}: {stats[0]} eventos, {stats[1]} descartados como fondo")
+    status_callback(f"Fondo ({foreground}): {total_dropped} eventos descartados en total")
 
     json_files = sorted(json_dir.glob('*.json'))
+    if not json_files:
+        status_callback("Error: Ninguna imagen produjo eventos para sintetizar.")
+        return
     status_callback(f"--- PASO 2 de 3: Sintetizando {len(json_files)} archivos en modo {output_mode} ---")
 
     results = []
@@ -90,6 +102,7 @@ if __name__ == "__main__":
     parser.add_argument("--input-folder", required=True)
     parser.add_argument("--output-file", required=True, help="Ruta del archivo de salida (.wav para modo WAV, no se usa para MIDI).")
     parser.add_argument("--output-mode", default="wav", choices=["wav", "midi"])
+    parser.add_argument("--foreground", default="backdrop", choices=FOREGROUND_MODES)
     
     # Argumentos WAV
     parser.add_argument("--duration", type=float, default=10.0)
@@ -1,4 +1,4 @@
-# scanner.py (Versión 3 - Optimizado con Numba)
+# scanner.py (Versión 4 - Extracción adaptativa de fondo)
 # --- Quick Index ---
 # Posible variable para revisión. Más control */*
 # Posible variable para revisión. Más eficiente */*
@@ -9,15 +9,106 @@ from PIL import Image
 from tqdm import tqdm
 import numpy as np
 from numba import jit
+from scipy import ndimage
+
+BRIGHTNESS_THRESHOLD = 20 # Umbral fijo original (modo 'threshold')
+FOREGROUND_MODES = ["backdrop", "otsu", "threshold"]
+PAPER_NOISE_K = 6 # Desviaciones robustas del papel por encima de la mediana para contar como planta
+
+def _otsu_threshold(values, n_bins):
+    # Umbral de Otsu sobre enteros 0..n_bins-1, vectorizado con NumPy. Devuelve None si la imagen es uniforme.
+    hist = np.bincount(values.ravel(), minlength=n_bins).astype(np.float64)
+    levels = np.arange(n_bins, dtype=np.float64)
+    w0 = np.cumsum(hist)
+    w1 = w0[-1] - w0
+    mu = np.cumsum(hist * levels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m0 = mu / w0
+        m1 = (mu[-1] - mu) / w1
+        between = np.nan_to_num(w0 * w1 * (m0 - m1) ** 2)
+    if between.max() <= 0:
+        return None
+    return int(np.argmax(between))
+
+def _border_mask(shape):
+    # Marco exterior de la imagen (2% del lado menor, mínimo 1 píxel): en un pliego de herbario casi siempre es papel.
+    b = max(1, min(shape[:2]) // 50)
+    border = np.ones(shape[:2], dtype=bool)
+    border[b:-b, b:-b] = False
+    return border
+
+def _paper_deviation(values, samples_mask, degree):
+    # Ajusta una superficie polinómica por canal a los píxeles de papel (viñeteo o luz desigual) y mide cuánto se aleja cada píxel.
+    # Devuelve (desviación por píxel, desviaciones de las muestras de papel).
+    h, w = values.shape[:2]
+    X = np.linspace(-1, 1, w, dtype=np.float32)
+    Y = np.linspace(-1, 1, h, dtype=np.float32)
+    powers = [(i, j) for i in range(degree + 1) for j in range(degree + 1 - i)]
+    ys, xs = np.nonzero(samples_mask)
+    stride = max(1, len(ys) // 200000) # Submuestreo para hojas escaneadas a alta resolución
+    ys, xs = ys[::stride], xs[::stride]
+    design = np.stack([X[xs] ** i * Y[ys] ** j for i, j in powers], axis=1)
+    samples = values[ys, xs]
+    keep = np.ones(len(samples), dtype=bool)
+    for _ in range(2): # Segundo ajuste sin los tallos u hojas que se colaron en la muestra
+        coef = np.linalg.lstsq(design[keep], samples[keep], rcond=None)[0]
+        residual = np.sqrt(((samples - design @ coef) ** 2).sum(axis=1))
+        med = np.median(residual[keep])
+        spread = 1.4826 * np.median(np.abs(residual[keep] - med))
+        keep = residual <= med + 3 * max(spread, 1.0)
+    # Superficie separable: Vy · C · Vxᵀ por canal, sin temporales del tamaño de la imagen por cada término
+    C = np.zeros((degree + 1, degree + 1, values.shape[2]), dtype=np.float32)
+    for k, (i, j) in enumerate(powers):
+        C[j, i] = coef[k]
+    Vx = X[:, None] ** np.arange(degree + 1)
+    Vy = Y[:, None] ** np.arange(degree + 1)
+    surface = np.einsum('hj,jic,wi->hwc', Vy, C, Vx, optimize=True)
+    deviation = np.sqrt(((values - surface) ** 2).sum(axis=2))
+    return deviation, residual[keep]
+
+def _paper_cutoff(paper):
+    # Corte según el ruido del propio papel: mediana + K desviaciones robustas
+    med = np.median(paper)
+    return med + PAPER_NOISE_K * max(1.4826 * np.median(np.abs(paper - med)), 1.0)
+
+def _foreground_mask(image_array_gray, image_array_rgb, mode):
+    # Máscara booleana (alto, ancho) con los píxeles que se convierten en eventos.
+    if mode == "threshold":
+        return image_array_gray > BRIGHTNESS_THRESHOLD
+    if mode == "otsu":
+        values, n_bins = image_array_gray[:, :, None].astype(np.float32), 256 # Desviación 0..255
+    elif mode == "backdrop":
+        values, n_bins = image_array_rgb.astype(np.float32), 443 # Desviación 0..442
+    else:
+        raise ValueError(f"Modo de fondo desconocido: {mode}")
+    # 1) Papel estimado desde el marco. 2) Reajuste con todo lo que claramente no es planta, para seguir el viñeteo del centro.
+    deviation, paper = _paper_deviation(values, _border_mask(values.shape), 2)
+    provisional = ndimage.binary_dilation(deviation > 2 * _paper_cutoff(paper), iterations=3)
+    if not provisional.all():
+        deviation, paper = _paper_deviation(values, ~provisional, 4)
+    cutoff = _paper_cutoff(paper)
+    # Si la clase alta de Otsu no sale del ruido del papel, el pliego está vacío
+    t = _otsu_threshold(np.clip(np.rint(deviation), 0, n_bins - 1).astype(np.int32), n_bins)
+    if t is None or deviation[deviation > t].mean() <= cutoff:
+        return np.zeros(image_array_gray.shape, dtype=bool)
+    # Todo lo que sale claramente del papel es planta, sea tallo oscuro o flor pálida
+    mask = deviation > cutoff
+    # Limpieza morfológica: la apertura quita el grano del papel, el cierre rellena huecos en hojas y tallos.
+    # Se rellena el borde replicándolo para que la erosión no borre plantas recortadas en el canto del pliego.
+    structure = np.ones((3, 3), dtype=bool)
+    mask = np.pad(mask, 1, mode='edge')
+    mask = ndimage.binary_opening(mask, structure=structure)
+    mask = ndimage.binary_closing(mask, structure=structure)
+    return mask[1:-1, 1:-1]
 
 @jit(nopython=True, cache=True)
-def _numba_scan(image_array_gray, image_array_rgb, width, height, brightness_threshold): # Esta función es compilada por Numba para máxima velocidad
+def _numba_scan(foreground_mask, image_array_gray, image_array_rgb, width, height): # Esta función es compilada por Numba para máxima velocidad
     pixel_data = []
     for x in range(width):
         # Usamos una tupla para la columna porque Numba no soporta listas de diccionarios
         column_pixels = []
         for y in range(height):
-            if image_array_gray[y, x] > brightness_threshold:
+            if foreground_mask[y, x]:
                 r, g, b = image_array_rgb[y, x]
                 # Guardamos como tuplas: (y, brillo, r, g, b)
                 column_pixels.append((y, image_array_gray[y, x], r, g, b))
@@ -26,8 +117,9 @@ def _numba_scan(image_array_gray, image_array_rgb, width, height, brightness_thr
             pixel_data.append((x, column_pixels))
     return pixel_data
 
-def analyze_image(image_path: Path, output_path: Path):
+def analyze_image(image_path: Path, output_path: Path, foreground="backdrop"):
     # Analiza imágenes y tranforma data a pixeles en un json.
+    # Devuelve (eventos, descartados): descartados son los píxeles que el umbral fijo habría emitido y el modo de fondo quitó.
     try:
         with Image.open(image_path) as img:
             # Asegurar la carga de imágenes RGB*
@@ -39,8 +131,16 @@ def analyze_image(image_path: Path, output_path: Path):
             image_array_gray = np.array(grayscale_img)
             width, height = img.size
             
+            foreground_mask = _foreground_mask(image_array_gray, image_array_rgb, foreground)
+            events = int(foreground_mask.sum())
+            dropped = int(((image_array_gray > BRIGHTNESS_THRESHOLD) & ~foreground_mask).sum())
+            if events == 0:
+                # Sin eventos (p. ej. un pliego en blanco) no se escribe JSON: la síntesis no admite 'data' vacío
+                output_path.unlink(missing_ok=True)
+                return events, dropped
+
             # Llamar a la función optimizada
-            numba_result = _numba_scan(image_array_gray, image_array_rgb, width, height, 20)
+            numba_result = _numba_scan(foreground_mask, image_array_gray, image_array_rgb, width, height)
             
             # Para registrar cada columna como representación del tiempo. Tal vez deba modificar para mejorar rendimiento a cambio de data.
             # Posible variable para revisión. Más eficiente */*
@@ -55,12 +155,15 @@ def analyze_image(image_path: Path, output_path: Path):
             output_path.parent.mkdir(parents=True, exist_ok=True)
             with open(output_path, 'w') as f:
                 json.dump({ "image_width": width, "image_height": height, "data": final_data }, f)
+            return events, dropped
     except Exception as e:
         print(f"Error procesando {image_path.name}: {e}")
+        return None
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Analiza imágenes y extrae datos de píxeles para sonificación.")
     parser.add_argument("--input", type=str, required=True, help="Ruta a la imagen o carpeta de imágenes a analizar.")
+    parser.add_argument("--foreground", type=str, default="backdrop", choices=FOREGROUND_MODES, help="Extracción de fondo: color dominante del papel, Otsu sobre brillo o umbral fijo.")
     args = parser.parse_args()
     input_path = Path(args.input)
     
@@ -84,5 +187,9 @@ if __name__ == "__main__":
             else:
                 output_dir = Path("data_output") / (input_path.parent.name if input_path.parent.name != "input_images" else "")
             output_path = output_dir / output_filename
-            analyze_image(image_file, output_path)
+            stats = analyze_image(image_file, output_path, args.foreground)
+            if stats and stats[0] == 0:
+                tqdm.write(f"{image_file.name}: sin eventos tras quitar el fondo, omitida")
+            elif stats:
+                tqdm.write(f"{image_file.name}: {stats[0]} eventos, {stats[1]} descartados como fondo")
         print("Análisis por lotes completado")
\ No newline at end of file
@@ -0,0 +1,131 @@
+# test_scanner.py - Extracción de fondo sobre pliegos sintéticos
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from scanner import FOREGROUND_MODES, _foreground_mask, _otsu_threshold, analyze_image
+
+PAPER = (240, 232, 210)
+PLANT = (40, 110, 40)
+
+STEM = (30, 60, 30)
+
+def _sheet(height=200, width=300, seed=0, grain=4, vignette=0.0):
+    # Papel crema con grano y, opcionalmente, una caída de luz lineal del centro a las esquinas
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    r = np.hypot((yy - height / 2) / (height / 2), (xx - width / 2) / (width / 2)) / np.sqrt(2)
+    paper = np.array(PAPER, dtype=float) * (1 - vignette * r)[..., None]
+    return np.clip(paper + rng.normal(0, grain, (height, width, 3)), 0, 255).astype(np.uint8)
+
+def _gray(rgb):
+    return np.array(Image.fromarray(rgb).convert("L"))
+
+@pytest.mark.parametrize("mode", ["backdrop", "otsu"])
+def test_only_plant_pixels_survive(mode):
+    rgb = _sheet()
+    truth = np.zeros(rgb.shape[:2], dtype=bool)
+    truth[50:150, 100:120] = True
+    truth[90:100, 60:240] = True
+    rgb[truth] = PLANT
+    mask = _foreground_mask(_gray(rgb), rgb, mode)
+    assert np.array_equal(mask, truth)
+
+@pytest.mark.parametrize("mode", ["backdrop", "otsu"])
+def test_plant_touching_sheet_edge_is_kept(mode):
+    rgb = _sheet()
+    truth = np.zeros(rgb.shape[:2], dtype=bool)
+    truth[80:86, 0:60] = True # tallo recortado en el borde izquierdo
+    truth[150:200, 200:206] = True # tallo recortado en el borde inferior
+    rgb[truth] = PLANT
+    mask = _foreground_mask(_gray(rgb), rgb, mode)
+    assert mask[80:86, 0].all()
+    assert mask[-1, 200:206].all()
+    assert np.array_equal(mask, truth)
+
+@pytest.mark.parametrize("mode", ["backdrop", "otsu"])
+def test_specimen_larger_than_backdrop(mode):
+    rgb = _sheet()
+    truth = np.zeros(rgb.shape[:2], dtype=bool)
+    truth[10:190, 10:290] = True # 180x280: la planta ocupa más que el papel
+    rgb[truth] = PLANT
+    mask = _foreground_mask(_gray(rgb), rgb, mode)
+    assert np.array_equal(mask, truth)
+
+@pytest.mark.parametrize("mode", ["backdrop", "otsu"])
+def test_uniform_image_has_no_events(mode):
+    rgb = np.full((50, 50, 3), 230, dtype=np.uint8)
+    assert not _foreground_mask(_gray(rgb), rgb, mode).any()
+
+@pytest.mark.parametrize("mode", ["backdrop", "otsu"])
+@pytest.mark.parametrize("grain, vignette", [(2, 0.0), (4, 0.0), (6, 0.0), (4, 0.15)])
+def test_blank_sheet_with_grain_or_vignette_has_no_events(mode, grain, vignette):
+    rgb = _sheet(400, 600, grain=grain, vignette=vignette)
+    assert not _foreground_mask(_gray(rgb), rgb, mode).any()
+
+@pytest.mark.parametrize("mode", ["backdrop", "otsu"])
+@pytest.mark.parametrize("leaf", [(180, 200, 150), (200, 180, 200), (150, 190, 120)])
+@pytest.mark.parametrize("vignette", [0.0, 0.15])
+def test_two_tone_plant_keeps_stem_and_pale_leaf(mode, leaf, vignette):
+    rgb = _sheet(400, 600, vignette=vignette)
+    truth = np.zeros(rgb.shape[:2], dtype=bool)
+    truth[50:350, 300:306] = True
+    rgb[truth] = STEM
+    rgb[100:190, 320:420] = leaf # hoja pálida de 90x100
+    truth[100:190, 320:420] = True
+    mask = _foreground_mask(_gray(rgb), rgb, mode)
+    assert np.array_equal(mask, truth)
+
+def test_backdrop_keeps_pale_flower():
+    # Flor amarilla casi tan clara como el papel: sólo el color la separa
+    rgb = _sheet(400, 600)
+    truth = np.zeros(rgb.shape[:2], dtype=bool)
+    truth[50:350, 300:306] = True
+    rgb[truth] = STEM
+    rgb[300:340, 100:150] = (250, 240, 120)
+    truth[300:340, 100:150] = True
+    mask = _foreground_mask(_gray(rgb), rgb, "backdrop")
+    assert np.array_equal(mask, truth)
+
+def test_threshold_mode_keeps_legacy_behaviour():
+    rgb = _sheet(20, 20)
+    rgb[:5] = 0
+    assert np.array_equal(_foreground_mask(_gray(rgb), rgb, "threshold"), _gray(rgb) > 20)
+
+@pytest.mark.parametrize("mode", FOREGROUND_MODES)
+def test_modes_are_known(mode):
+    rgb = _sheet(20, 20)
+    assert _foreground_mask(_gray(rgb), rgb, mode).shape == (20, 20)
+
+def test_otsu_threshold_uniform_is_none():
+    assert _otsu_threshold(np.full((10, 10), 7, dtype=np.int32), 256) is None
+
+def test_unknown_mode_raises():
+    rgb = _sheet(20, 20)
+    with pytest.raises(ValueError):
+        _foreground_mask(_gray(rgb), rgb, "magic")
+
+def test_analyze_image_reports_events_and_dropped(tmp_path):
+    rgb = _sheet()
+    rgb[50:150, 100:120] = PLANT
+    image_path = tmp_path / "hoja.png"
+    Image.fromarray(rgb).save(image_path)
+    output_path = tmp_path / "out" / "hoja.json"
+
+    events, dropped = analyze_image(image_path, output_path)
+    assert (events, dropped) == (100 * 20, 200 * 300 - 100 * 20)
+    with open(output_path) as f:
+        data = json.load(f)["data"]
+    assert [item["time_step"] for item in data] == list(range(100, 120))
+    assert sum(len(item["pixels"]) for item in data) == events
+
+def test_analyze_image_blank_sheet_writes_no_json(tmp_path):
+    image_path = tmp_path / "blanco.png"
+    Image.fromarray(np.full((50, 50, 3), 230, dtype=np.uint8)).save(image_path)
+    output_path = tmp_path / "blanco.json"
+    output_path.write_text("{}") # JSON de una ejecución anterior
+
+    assert analyze_image(image_path, output_path) == (0, 50 * 50)
+    assert not output_path.exists()